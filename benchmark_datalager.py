@@ -0,0 +1,70 @@
+"""
+benchmark_datalager.py
+
+Sammenligner aggregering av kødata fra CSV + pandas med aggregering i det lokale
+datalageret (datalager.py), på eksportert data og på syntetisk oppskalert data.
+Oppskaleringen kopierer kødataene med nye strekningsnavn, slik at antall rader
+og antall strekninger øker med samme faktor.
+
+Bruk:
+    python benchmark_datalager.py
+    python benchmark_datalager.py --skala 1 20 --datalager-type duckdb
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+import datalager
+from generer_dashbord import _read_input, load_and_process_ko_data, aggregate_ko_data, aggregate_ko_data_from_store
+
+
+def make_synthetic(df_ko, skala):
+    """Kopier kødataene skala ganger, med strekningsnavn merket med kopinummer"""
+    kopier = []
+    for i in range(skala):
+        kopi = df_ko.copy()
+        if i > 0:
+            kopi["stop_name"] = kopi["stop_name"] + f" #{i}"
+        kopier.append(kopi)
+    return pd.concat(kopier, ignore_index=True)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CSV + pandas mot lokalt datalager")
+    parser.add_argument("--kodata", default="data/inndata_asker_ko.csv")
+    parser.add_argument("--skala", type=int, nargs="+", default=[1, 20])
+    parser.add_argument("--datalager-type", choices=["sqlite", "duckdb"], default="sqlite")
+    args = parser.parse_args()
+
+    df_ko = _read_input(args.kodata, "ko")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for skala in args.skala:
+            df = make_synthetic(df_ko, skala)
+            csv_path = os.path.join(tmp, f"ko_{skala}.csv")
+            store_path = os.path.join(tmp, f"ko_{skala}.{args.datalager_type}")
+            df.to_csv(csv_path, sep=";", decimal=",", index=False, encoding="utf-8-sig")
+            _, t_skriv = timed(datalager.write_store, store_path, {"ko": df})
+
+            ko_data, t_csv_les = timed(load_and_process_ko_data, csv_path)
+            agg_csv, t_csv_agg = timed(aggregate_ko_data, ko_data)
+            agg_lager, t_lager_agg = timed(aggregate_ko_data_from_store, store_path)
+
+            print(f"\nSkala {skala}x: {len(df)} rader, {df['stop_name'].nunique()} strekninger")
+            print(f"  CSV + pandas:  les {t_csv_les:6.2f} s, aggreger {t_csv_agg:6.2f} s")
+            print(f"  {args.datalager_type:<13} skriv {t_skriv:6.2f} s, aggreger {t_lager_agg:6.2f} s")
+            print(f"  Samme datasett: {agg_csv == agg_lager}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+datalager.py
+
+Lokalt analyselager for de eksporterte tabellene (kødata, reisestatistikk og nøkkeltall).
+Lageret er én SQLite-fil (standard) eller én DuckDB-fil (filendelse .duckdb, krever
+pakken duckdb), med indekser på kolonnene dashbordet filtrerer og grupperer på.
+
+Lageret skrives av oppdater_data.py (--datalager) og kan leses av generer_dashbord.py
+(--datalager) i stedet for CSV-filene.
+"""
+
+import os
+import sqlite3
+
+import pandas as pd
+
+KO_MAALEVERDIER = ("faktisk_tid", "ko_min_km", "forsinkelser", "bil")
+
+INDEKSER = {
+    "ko": ("stop_name", "tid_dag", "dato"),
+    "nokkel": ("delomrade_fra", "delomrade_til", "kvartal"),
+}
+
+
+class _Median:
+    """Median-aggregat for SQLite (DuckDB har median innebygd). Ignorerer NULL som pandas."""
+
+    def __init__(self):
+        self.values = []
+
+    def step(self, value):
+        if value is not None:
+            self.values.append(value)
+
+    def finalize(self):
+        if not self.values:
+            return None
+        values = sorted(self.values)
+        mid = len(values) // 2
+        if len(values) % 2:
+            return values[mid]
+        return (values[mid - 1] + values[mid]) / 2
+
+
+def is_duckdb(path):
+    return str(path).endswith(".duckdb")
+
+
+def connect(path):
+    """Åpne en tilkobling til lageret"""
+    if is_duckdb(path):
+        import duckdb
+        return duckdb.connect(str(path))
+    con = sqlite3.connect(str(path))
+    con.create_aggregate("median", 1, _Median)
+    return con
+
+
+def query(con, sql, params=()):
+    """Kjør en spørring og returner resultatet som DataFrame"""
+    if isinstance(con, sqlite3.Connection):
+        return pd.read_sql_query(sql, con, params=list(params))
+    return con.execute(sql, list(params)).df()
+
+
+def write_store(path, tables):
+    """Skriv tabellene (navn -> DataFrame) til en ny lagerfil, med indekser.
+
+    Filen bygges ved siden av og byttes inn til slutt, så en avbrutt skriving
+    aldri etterlater et halvferdig lager.
+    """
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    con = connect(tmp_path)
+    try:
+        for name, df in tables.items():
+            df = df.copy()
+            if "dato" in df.columns:
+                df["dato"] = pd.to_datetime(df["dato"]).dt.strftime("%Y-%m-%d")
+
+            if isinstance(con, sqlite3.Connection):
+                df.to_sql(name, con, index=False)
+            else:
+                con.register("_ny_tabell", df)
+                con.execute(f"CREATE TABLE {name} AS SELECT * FROM _ny_tabell")
+                con.unregister("_ny_tabell")
+
+            if name in INDEKSER:
+                cols = ", ".join(INDEKSER[name])
+                con.execute(f"CREATE INDEX idx_{name} ON {name} ({cols})")
+
+        if isinstance(con, sqlite3.Connection):
+            con.execute("ANALYZE")
+            con.commit()
+    finally:
+        con.close()
+
+    os.replace(tmp_path, path)
+
+
+def read_table(path, name):
+    """Les en hel tabell fra lageret"""
+    con = connect(path)
+    try:
+        return query(con, f"SELECT * FROM {name}")
+    finally:
+        con.close()
+
+
+def ko_groupby(con, tid_dag, keys, how):
+    """Grupper kødata for én tid_dag i lageret.
+
+    how="vektet" gir snitt av ko_min_km og forsinkelser vektet med bil (samme regel som
+    i aggregate_ko_data), how="median" gir median. Rader med manglende nøkler eller uten
+    noen måleverdier utelates, slik pandas groupby og valideringen i generer_dashbord gjør.
+    """
+    cols = ", ".join(keys)
+    if how == "vektet":
+        measures = ", ".join(
+            f"SUM(CASE WHEN {m} IS NOT NULL AND bil > 0 THEN {m} * bil END)"
+            f" / SUM(CASE WHEN {m} IS NOT NULL AND bil > 0 THEN bil END) AS {m}"
+            for m in ("ko_min_km", "forsinkelser")
+        )
+    else:
+        measures = "median(ko_min_km) AS ko_min_km, median(forsinkelser) AS forsinkelser"
+    not_null = "".join(f" AND {k} IS NOT NULL" for k in keys)
+    not_null += " AND NOT (" + " AND ".join(f"{m} IS NULL" for m in KO_MAALEVERDIER) + ")"
+
+    df = query(
+        con,
+        f"SELECT {cols}, {measures} FROM ko WHERE tid_dag = ?{not_null} GROUP BY {cols} ORDER BY {cols}",
+        [tid_dag],
+    )
+    df["ko_min_km"] = pd.to_numeric(df["ko_min_km"], errors="coerce")
+    df["forsinkelser"] = pd.to_numeric(df["forsinkelser"], errors="coerce")
+    if "dato" in keys:
+        df["dato"] = pd.to_datetime(df["dato"])
+    return df
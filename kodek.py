@@ -0,0 +1,207 @@
+"""
+kodek.py
+
+Kompakt koding av tidsseriene som bygges inn i dashbordet (koData og reiserData).
+
+- Tallverdier lagres som fastpunkts-heltall (verdi * 10**desimaler), null beholdes.
+- Datoer lagres som antall dager fra forrige dato i serien (første fra basisdato).
+  Visningsdatoen (dd.mm.åååå) utledes fra ISO-datoen i nettleseren.
+- Klokkeslett lagres som indeks i én felles liste.
+
+JS_DEKODER inneholder dekoderen som bygges inn i siden. decode_ko_data og
+decode_reiser_data er Python-speilet av den. Begge testes mot koderen i tests/test_kodek.py.
+"""
+
+from datetime import date, timedelta
+
+KO_DESIMALER = 3
+REISER_DESIMALER = 2
+REISER_MODI = ["bil", "buss", "sykkel", "gange"]
+
+
+def encode_fixed(values, decimals):
+    skala = 10 ** decimals
+    return [None if v is None else int(round(v * skala)) for v in values]
+
+
+def decode_fixed(values, decimals):
+    skala = 10 ** decimals
+    return [None if v is None else v / skala for v in values]
+
+
+def encode_days(datoer_iso, basisdato):
+    forrige = date.fromisoformat(basisdato)
+    dager = []
+    for iso in datoer_iso:
+        dato = date.fromisoformat(iso)
+        dager.append((dato - forrige).days)
+        forrige = dato
+    return dager
+
+
+def decode_days(dager, basisdato):
+    dato = date.fromisoformat(basisdato)
+    datoer_iso = []
+    for d in dager:
+        dato += timedelta(days=d)
+        datoer_iso.append(dato.isoformat())
+    return datoer_iso
+
+
+def encode_ko_data(ko_aggregated, decimals=KO_DESIMALER):
+    """Kod koData (resultatet av aggregate_ko_data) kompakt"""
+    alle_datoer = []
+    alle_klokkeslett = set()
+    for data in ko_aggregated.values():
+        if "datoer_iso" in data:
+            alle_datoer.extend(data["datoer_iso"])
+        elif "records" in data:
+            alle_datoer.extend(r["dato_iso"] for r in data["records"])
+            alle_klokkeslett.update(r["klokkeslett"] for r in data["records"])
+        else:
+            alle_klokkeslett.update(data["klokkeslett"])
+
+    basisdato = min(alle_datoer) if alle_datoer else None
+    klokkeslett = sorted(alle_klokkeslett)
+    kl_indeks = {kl: i for i, kl in enumerate(klokkeslett)}
+
+    serier = {}
+    for key, data in ko_aggregated.items():
+        if "datoer_iso" in data:
+            serier[key] = {
+                "dager": encode_days(data["datoer_iso"], basisdato),
+                "ko": encode_fixed(data["ko"], decimals),
+                "forsinkelser": encode_fixed(data["forsinkelser"], decimals)
+            }
+        elif "records" in data:
+            records = data["records"]
+            serier[key] = {
+                "records": {
+                    "dager": encode_days([r["dato_iso"] for r in records], basisdato),
+                    "klokkeslett": [kl_indeks[r["klokkeslett"]] for r in records],
+                    "ko": encode_fixed([r["ko"] for r in records], decimals),
+                    "forsinkelser": encode_fixed([r["forsinkelser"] for r in records], decimals)
+                }
+            }
+        else:
+            serier[key] = {
+                "klokkeslett": [kl_indeks[kl] for kl in data["klokkeslett"]],
+                "ko": encode_fixed(data["ko"], decimals),
+                "forsinkelser": encode_fixed(data["forsinkelser"], decimals)
+            }
+
+    return {
+        "desimaler": decimals,
+        "basisdato": basisdato,
+        "klokkeslett": klokkeslett,
+        "serier": serier
+    }
+
+
+def decode_ko_data(kodet):
+    """Gjenskap koData fra encode_ko_data (samme regler som dekodKoData i JS_DEKODER)"""
+    decimals = kodet["desimaler"]
+    basisdato = kodet["basisdato"]
+    klokkeslett = kodet["klokkeslett"]
+
+    ko_aggregated = {}
+    for key, data in kodet["serier"].items():
+        if "dager" in data:
+            datoer_iso = decode_days(data["dager"], basisdato)
+            ko_aggregated[key] = {
+                "datoer": [f"{iso[8:10]}.{iso[5:7]}.{iso[0:4]}" for iso in datoer_iso],
+                "datoer_iso": datoer_iso,
+                "ko": decode_fixed(data["ko"], decimals),
+                "forsinkelser": decode_fixed(data["forsinkelser"], decimals)
+            }
+        elif "records" in data:
+            rec = data["records"]
+            ko_aggregated[key] = {
+                "records": [
+                    {"dato_iso": iso, "klokkeslett": klokkeslett[kl], "ko": ko, "forsinkelser": fors}
+                    for iso, kl, ko, fors in zip(
+                        decode_days(rec["dager"], basisdato),
+                        rec["klokkeslett"],
+                        decode_fixed(rec["ko"], decimals),
+                        decode_fixed(rec["forsinkelser"], decimals)
+                    )
+                ]
+            }
+        else:
+            ko_aggregated[key] = {
+                "klokkeslett": [klokkeslett[kl] for kl in data["klokkeslett"]],
+                "ko": decode_fixed(data["ko"], decimals),
+                "forsinkelser": decode_fixed(data["forsinkelser"], decimals)
+            }
+
+    return ko_aggregated
+
+
+def encode_reiser_data(reiser_data, decimals=REISER_DESIMALER):
+    """Kod reiserData (per strekning: kvartaler, og verdier og trend per transportmiddel) kompakt"""
+    return {
+        "desimaler": decimals,
+        "serier": {
+            strekning: {
+                "kvartaler": data["kvartaler"],
+                "verdier": {m: encode_fixed(v, decimals) for m, v in data["verdier"].items()},
+                "trend": {m: encode_fixed(v, decimals) for m, v in data["trend"].items()}
+            }
+            for strekning, data in reiser_data.items()
+        }
+    }
+
+
+def decode_reiser_data(kodet):
+    """Gjenskap reiserData fra encode_reiser_data (samme regler som dekodReiserData i JS_DEKODER)"""
+    decimals = kodet["desimaler"]
+    return {
+        strekning: {
+            "kvartaler": data["kvartaler"],
+            "verdier": {m: decode_fixed(v, decimals) for m, v in data["verdier"].items()},
+            "trend": {m: decode_fixed(v, decimals) for m, v in data["trend"].items()}
+        }
+        for strekning, data in kodet["serier"].items()
+    }
+
+
+JS_DEKODER = """
+        function dekodFastpunkt(verdier, desimaler) {
+            const skala = Math.pow(10, desimaler);
+            return verdier.map(v => v === null ? null : v / skala);
+        }
+
+        function dekodDager(dager, basisdato) {
+            let t = Date.parse(basisdato + 'T00:00:00Z');
+            return dager.map(d => { t += d * 86400000; return new Date(t).toISOString().slice(0, 10); });
+        }
+
+        function dekodKoData(kodet) {
+            const des = kodet.desimaler;
+            const result = {};
+            for (const [key, data] of Object.entries(kodet.serier)) {
+                if (data.dager) {
+                    const datoerIso = dekodDager(data.dager, kodet.basisdato);
+                    result[key] = { datoer: datoerIso.map(formatDateNorwegian), datoer_iso: datoerIso, ko: dekodFastpunkt(data.ko, des), forsinkelser: dekodFastpunkt(data.forsinkelser, des) };
+                } else if (data.records) {
+                    const rec = data.records;
+                    const datoerIso = dekodDager(rec.dager, kodet.basisdato);
+                    const ko = dekodFastpunkt(rec.ko, des);
+                    const forsinkelser = dekodFastpunkt(rec.forsinkelser, des);
+                    result[key] = { records: datoerIso.map((iso, i) => ({ dato_iso: iso, klokkeslett: kodet.klokkeslett[rec.klokkeslett[i]], ko: ko[i], forsinkelser: forsinkelser[i] })) };
+                } else {
+                    result[key] = { klokkeslett: data.klokkeslett.map(i => kodet.klokkeslett[i]), ko: dekodFastpunkt(data.ko, des), forsinkelser: dekodFastpunkt(data.forsinkelser, des) };
+                }
+            }
+            return result;
+        }
+
+        function dekodReiserData(kodet) {
+            const dekodModi = modi => Object.fromEntries(Object.entries(modi).map(([m, v]) => [m, dekodFastpunkt(v, kodet.desimaler)]));
+            const result = {};
+            for (const [strekning, data] of Object.entries(kodet.serier)) {
+                result[strekning] = { kvartaler: data.kvartaler, verdier: dekodModi(data.verdier), trend: dekodModi(data.trend) };
+            }
+            return result;
+        }
+"""
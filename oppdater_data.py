@@ -6,38 +6,114 @@ Etter kjøring, commit og push endringene til GitHub.
 
 Bruk:
     python oppdater_data.py
+    python oppdater_data.py --datalager data/dashbord.sqlite
+    python oppdater_data.py --lokal Data
+    python oppdater_data.py --datakatalog /tmp/data
+
+Med --datalager lastes tabellene i tillegg inn i ett lokalt SQLite-lager (eller DuckDB
+ved filendelse .duckdb), som generer_dashbord.py kan lese fra med samme flagg.
+Med --lokal brukes LocalClient, som svarer på spørringene fra CSV-filer i en katalog
+i stedet for fra ClickHouse (for kjøring og testing uten databasetilgang).
+
+For planlagt kjøring av eksport og bygging samlet, se pipeline.py.
 """
 
-import clickhouse_connect
-
-# Koble til ClickHouse
-client = clickhouse_connect.get_client(host='localhost', port=8123, database='tromso_indikatorer')
-
-# Eksport av kødata
-print("Eksporterer kødata...")
-df_ko = client.query_df(
-    "SELECT dato, klokkeslett, stop_name, tid_dag, faktisk_tid, avstand, normal_tid, ko_min_km, forsinkelser, bil FROM `3-05 til dashbord ko`"
-)
-df_ko.to_csv("data/inndata_asker_ko.csv", sep=";", decimal=",", index=False, encoding="utf-8-sig")
-print(f"Eksportert {len(df_ko)} rader (kødata)")
-
-# Eksport av reisestatistikk
-print("Eksporterer reisestatistikk...")
-df_reiser = client.query_df(
-    "SELECT ID, kvartal, bil, buss, sykkel, gange FROM `3-05 til dashbord reiser`"
-)
-df_reiser.to_csv("data/inndata_asker_reiser.csv", sep=";", decimal=",", index=False, encoding="utf-8-sig")
-print(f"Eksportert {len(df_reiser)} rader (reisestatistikk)")
-
-# Eksport av reisestatistikk
-print("Eksporterer nøkkeltall...")
-df_nokkel = client.query_df(
-    "SELECT * FROM `3-06 Nokkeltall`"
-)
-df_nokkel.to_csv("data/inndata_asker_nokkel.csv", sep=";", decimal=",", index=False, encoding="utf-8-sig")
-print(f"Eksportert {len(df_nokkel)} rader (Nøkkeltall)")
-
-print("\nFerdig! Husk å committe og pushe til GitHub:")
-print("  git add data/")
-print("  git commit -m 'Oppdatert data'")
-print("  git push")
\ No newline at end of file
+import argparse
+import os
+
+import pandas as pd
+
+import datalager
+
+SPORRINGER = {
+    "ko": "SELECT dato, klokkeslett, stop_name, tid_dag, faktisk_tid, avstand, normal_tid, ko_min_km, forsinkelser, bil FROM `3-05 til dashbord ko`",
+    "reiser": "SELECT ID, kvartal, bil, buss, sykkel, gange FROM `3-05 til dashbord reiser`",
+    "nokkel": "SELECT * FROM `3-06 Nokkeltall`",
+}
+BESKRIVELSER = {"ko": "kødata", "reiser": "reisestatistikk", "nokkel": "nøkkeltall"}
+
+
+def csv_path(katalog, tabell):
+    return os.path.join(katalog, f"inndata_asker_{tabell}.csv")
+
+
+def get_client():
+    """Koble til ClickHouse"""
+    import clickhouse_connect
+    return clickhouse_connect.get_client(host='localhost', port=8123, database='tromso_indikatorer')
+
+
+class LocalClient:
+    """Lokal erstatning for ClickHouse-klienten.
+
+    Svarer på eksportspørringene (SPORRINGER) med innholdet i CSV-filene i katalog, lest
+    slik at en ny eksport til CSV blir byte-identisk med filene.
+    """
+
+    def __init__(self, katalog):
+        self.katalog = katalog
+
+    def query_df(self, sql):
+        for tabell, sporring in SPORRINGER.items():
+            if sql == sporring:
+                return pd.read_csv(csv_path(self.katalog, tabell), sep=";", decimal=",", encoding="utf-8-sig",
+                                   float_precision="round_trip")
+        raise ValueError(f"Ukjent spørring: {sql}")
+
+
+def _write_if_changed(path, innhold):
+    """Skriv innhold (bytes) til path hvis det er forskjellig fra det som ligger der. Returnerer om filen ble endret"""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if f.read() == innhold:
+                return False
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(innhold)
+    os.replace(tmp_path, path)
+    return True
+
+
+def export_data(client, katalog="data", datalager_path=None):
+    """Eksporter tabellene til CSV-filer i katalog (og eventuelt til datalageret).
+
+    Filer med uendret innhold skrives ikke på nytt. Returnerer {sti: endret}.
+    """
+    os.makedirs(katalog, exist_ok=True)
+    tabeller = {}
+    endret = {}
+    for tabell, sporring in SPORRINGER.items():
+        print(f"Eksporterer {BESKRIVELSER[tabell]}...")
+        df = client.query_df(sporring)
+        innhold = df.to_csv(sep=";", decimal=",", index=False).encode("utf-8-sig")
+        path = csv_path(katalog, tabell)
+        endret[path] = _write_if_changed(path, innhold)
+        tabeller[tabell] = df
+        print(f"Eksportert {len(df)} rader ({BESKRIVELSER[tabell]}){'' if endret[path] else ', uendret'}")
+
+    if datalager_path and (any(endret.values()) or not os.path.exists(datalager_path)):
+        print(f"Skriver datalager {datalager_path}...")
+        datalager.write_store(datalager_path, tabeller)
+
+    return endret
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Oppdater CSV-filene fra ClickHouse")
+    parser.add_argument("--datakatalog", default="data", help="katalog for de eksporterte CSV-filene (standard: data)")
+    parser.add_argument("--datalager", help="last også tabellene inn i et lokalt datalager (.sqlite/.duckdb)")
+    parser.add_argument("--lokal", metavar="KATALOG", help="les fra CSV-filer i KATALOG i stedet for ClickHouse")
+    args = parser.parse_args(argv)
+
+    client = LocalClient(args.lokal) if args.lokal else get_client()
+    export_data(client, args.datakatalog, args.datalager)
+
+    print("\nFerdig! Husk å committe og pushe til GitHub:")
+    print(f"  git add {args.datakatalog}/")
+    print("  git commit -m 'Oppdatert data'")
+    print("  git push")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+pipeline.py
+
+Kjører hele oppdateringen i ett steg: eksport fra ClickHouse (oppdater_data.py) og
+deretter bygging av dashbordet (generer_dashbord.py). Byggingen hoppes over når både
+de eksporterte dataene og byggekoden (generatoren, malene og kodeken) er uendret siden
+forrige vellykkede bygg.
+
+Laget for planlagt kjøring (cron): en låsfil i datakatalogen hindrer at to kjøringer
+skriver til data/ samtidig, tiden for hvert steg skrives ut og lagres, og exit-koden
+forteller hvordan det gikk.
+
+Bruk:
+    python pipeline.py
+    python pipeline.py --lokal Data --datakatalog /tmp/data --output /tmp/docs/index.html
+
+Exit-koder:
+    0   ferdig (nytt bygg, eller ingen endring i dataene)
+    1   eksporten feilet
+    2   byggingen feilet
+    75  en annen kjøring pågår (EX_TEMPFAIL, cron kan prøve igjen senere)
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import sys
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+
+import datalager
+import generer_dashbord
+import kodek
+import oppdater_data
+
+EXIT_OK = 0
+EXIT_EKSPORT_FEILET = 1
+EXIT_BYGG_FEILET = 2
+EXIT_LAAST = 75
+
+TILSTANDSFIL = ".pipeline.json"
+LAASFIL = ".pipeline.lock"
+
+
+class PipelineLocked(Exception):
+    pass
+
+
+@contextmanager
+def pipeline_lock(katalog):
+    """Eksklusiv lås på katalog så lenge blokken kjører. Kaster PipelineLocked hvis låsen er tatt"""
+    os.makedirs(katalog, exist_ok=True)
+    with open(os.path.join(katalog, LAASFIL), "w") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise PipelineLocked(f"En annen kjøring holder låsen i {katalog}")
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_state(katalog):
+    path = os.path.join(katalog, TILSTANDSFIL)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_state(katalog, state):
+    with generer_dashbord.atomic_open(os.path.join(katalog, TILSTANDSFIL)) as f:
+        json.dump(state, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def generator_version():
+    """Versjon av byggekoden: generer_dashbord.py med malene, kodek.py og datalager.py"""
+    return generer_dashbord.input_version([
+        generer_dashbord.__file__, generer_dashbord.HTML_MAL, generer_dashbord.SW_MAL,
+        kodek.__file__, datalager.__file__,
+    ])
+
+
+def run_pipeline(client, datakatalog="data", output="docs/index.html", datalager_path=None, force=False):
+    """Kjør eksport og bygg. Returnerer (exit-kode, tider per steg i sekunder)"""
+    tider = {}
+
+    start = time.perf_counter()
+    try:
+        oppdater_data.export_data(client, datakatalog, datalager_path)
+    except Exception:
+        traceback.print_exc()
+        return EXIT_EKSPORT_FEILET, tider
+    tider["eksport"] = time.perf_counter() - start
+
+    # Samme inndata og rekkefølge som generer_dashbord.main, så versjonen er den samme som i sw.js
+    inndata = generer_dashbord.input_files(datakatalog, datalager_path)
+    versjon = generer_dashbord.input_version(inndata.values())
+    generator = generator_version()
+    state = read_state(datakatalog)
+
+    if (not force and state.get("versjon") == versjon and state.get("generator") == generator
+            and os.path.exists(output)):
+        print(f"\nDataene og byggekoden er uendret (versjon {versjon}), hopper over byggingen")
+        return EXIT_OK, tider
+
+    start = time.perf_counter()
+    argv = ["--datakatalog", datakatalog, "--output", output]
+    if datalager_path:
+        argv += ["--datalager", datalager_path]
+    try:
+        generer_dashbord.main(argv)
+    except Exception:
+        traceback.print_exc()
+        return EXIT_BYGG_FEILET, tider
+    tider["bygg"] = time.perf_counter() - start
+
+    write_state(datakatalog, {
+        "versjon": versjon,
+        "generator": generator,
+        "bygget": datetime.now().isoformat(timespec="seconds"),
+        "tider": {steg: round(t, 3) for steg, t in tider.items()},
+    })
+    return EXIT_OK, tider
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Eksporter data og bygg dashbordet ved endringer")
+    parser.add_argument("--datakatalog", default="data", help="katalog for de eksporterte CSV-filene (standard: data)")
+    parser.add_argument("--output", default="docs/index.html", help="siden som skal genereres (standard: docs/index.html)")
+    parser.add_argument("--datalager", help="last også inn i og bygg fra et lokalt datalager (.sqlite/.duckdb)")
+    parser.add_argument("--lokal", metavar="KATALOG", help="les fra CSV-filer i KATALOG i stedet for ClickHouse")
+    parser.add_argument("--force", action="store_true", help="bygg selv om dataene er uendret")
+    args = parser.parse_args(argv)
+
+    try:
+        with pipeline_lock(args.datakatalog):
+            try:
+                client = oppdater_data.LocalClient(args.lokal) if args.lokal else oppdater_data.get_client()
+            except Exception:
+                traceback.print_exc()
+                return EXIT_EKSPORT_FEILET
+            kode, tider = run_pipeline(client, args.datakatalog, args.output, args.datalager, args.force)
+    except PipelineLocked as e:
+        print(e, file=sys.stderr)
+        return EXIT_LAAST
+
+    if tider:
+        print("\nTid per steg: " + ", ".join(f"{steg} {t:.1f} s" for steg, t in tider.items()))
+    return kode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+// Service worker for mobilitetsdashbordet, generert av generer_dashbord.py.
+// Skallet (siden og Plotly) serveres stale-while-revalidate. Datafilene har innholdshash
+// i filnavnet og endres aldri, så de serveres fra cache og hentes bare når de er nye.
+// Datafilene fra forrige bygg beholdes, slik at en side fra forrige versjon fortsatt virker.
+
+const VERSJON = '@@versjon@@';
+const SKALL_CACHE = 'mobilitetsdashbord-skall-' + VERSJON;
+const DATA_CACHE = 'mobilitetsdashbord-data';
+const SKALL = @@skall@@;
+const PLOTLY_URL = '@@plotly_url@@';
+const DATAFILER = @@datafiler@@;
+const FORRIGE_DATAFILER = @@forrige_datafiler@@;
+
+const absolutt = url => new URL(url, self.registration.scope).href;
+
+self.addEventListener('install', event => {
+    event.waitUntil(Promise.all([
+        caches.open(SKALL_CACHE).then(cache => Promise.all([
+            // cache: 'reload' forbi HTTP-cachen, så skallet er fra samme bygg som VERSJON
+            cache.addAll(SKALL.map(url => new Request(url, { cache: 'reload' }))),
+            fetch(new Request(PLOTLY_URL, { mode: 'no-cors' })).then(r => cache.put(PLOTLY_URL, r))
+        ])),
+        caches.open(DATA_CACHE).then(cache => cache.addAll(DATAFILER))
+    ]).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', event => {
+    const beholdes = new Set(DATAFILER.concat(FORRIGE_DATAFILER).map(absolutt));
+    event.waitUntil(Promise.all([
+        caches.keys().then(navn => Promise.all(
+            navn.filter(n => n.startsWith('mobilitetsdashbord-skall-') && n !== SKALL_CACHE).map(n => caches.delete(n))
+        )),
+        caches.open(DATA_CACHE).then(cache => cache.keys().then(requests => Promise.all(
+            requests.filter(r => !beholdes.has(r.url)).map(r => cache.delete(r))
+        )))
+    ]).then(() => self.clients.claim()));
+});
+
+function staleWhileRevalidate(event, cacheNavn) {
+    return caches.open(cacheNavn).then(cache => cache.match(event.request, { ignoreSearch: true }).then(cached => {
+        const nett = fetch(event.request).then(response => {
+            if (response.ok || response.type === 'opaque') cache.put(event.request, response.clone());
+            return response;
+        });
+        if (cached) {
+            event.waitUntil(nett.catch(() => undefined));
+            return cached;
+        }
+        return nett;
+    }));
+}
+
+function cacheFirst(event, cacheNavn) {
+    return caches.open(cacheNavn).then(cache => cache.match(event.request).then(cached => cached || fetch(event.request).then(response => {
+        if (response.ok) cache.put(event.request, response.clone());
+        return response;
+    })));
+}
+
+self.addEventListener('fetch', event => {
+    if (event.request.method !== 'GET') return;
+    const url = event.request.url;
+    if (DATAFILER.concat(FORRIGE_DATAFILER).some(f => absolutt(f) === url)) {
+        event.respondWith(cacheFirst(event, DATA_CACHE));
+    } else if (url === PLOTLY_URL || SKALL.some(f => absolutt(f) === url.split('?')[0])) {
+        event.respondWith(staleWhileRevalidate(event, SKALL_CACHE));
+    }
+});
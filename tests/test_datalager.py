@@ -0,0 +1,40 @@
+"""
+Aggregering i datalageret skal gi samme datasett som aggregering i pandas.
+"""
+
+import pandas as pd
+
+import datalager
+from generer_dashbord import aggregate_ko_data, aggregate_ko_data_from_store, load_and_process_ko_data
+
+
+def _ko_frame():
+    rader = [
+        # dato, klokkeslett, stop_name, tid_dag, ko_min_km, forsinkelser, bil
+        ("2024-01-02", "07:15", "Sentrum", "Morgen", 0.41, 1.7, 12),
+        ("2024-01-02", "07:15", "Kroken", "Morgen", 1.33, -0.4, 30),
+        ("2024-01-02", "07:30", "Sentrum", "Morgen", None, 2.2, 8),
+        ("2024-01-02", "07:30", "Kroken", "Morgen", 0.9, None, 0),
+        ("2024-01-03", "07:15", "Sentrum", "Morgen", 0.77, 0.3, 0),
+        ("2024-01-03", "07:15", "Kroken", "Morgen", 2.05, 3.1, 17),
+        ("2024-01-03", "07:30", "Kroken", "Morgen", None, None, None),
+        ("2024-01-05", "07:30", "Kroken", "Morgen", 0.12, -1.25, None),
+        ("2024-01-02", "15:45", "Sentrum", "Ettermiddag", 1.9, 4.4, 21),
+        ("2024-01-02", "16:00", "Sentrum", "Ettermiddag", 1.1, 2.6, 0),
+        ("2024-01-03", "15:45", "Kroken", "Ettermiddag", 0.35, 0.8, 5),
+    ]
+    df = pd.DataFrame(rader, columns=["dato", "klokkeslett", "stop_name", "tid_dag", "ko_min_km", "forsinkelser", "bil"])
+    df["faktisk_tid"] = df["forsinkelser"] + 10
+    df["avstand"] = 2.5
+    df["normal_tid"] = 10.0
+    return df
+
+
+def test_store_aggregation_matches_pandas(tmp_path):
+    path = str(tmp_path / "dashbord.sqlite")
+    datalager.write_store(path, {"ko": _ko_frame()})
+
+    fra_lager = aggregate_ko_data_from_store(path)
+    fra_pandas = aggregate_ko_data(load_and_process_ko_data(path))
+
+    assert fra_lager == fra_pandas
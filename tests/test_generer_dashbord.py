@@ -0,0 +1,152 @@
+"""
+Tester for innlesing, validering og aggregering i generer_dashbord.py.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import pandas as pd
+import pytest
+
+import generer_dashbord
+
+ROT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = os.path.join(ROT, "Data")
+MAL = os.path.join(ROT, "dashbord_mal.html")
+
+
+def test_parallel_aggregation_matches_serial():
+    df = generer_dashbord.load_and_process_ko_data(os.path.join(DATA, "inndata_asker_ko.csv"))
+
+    serielt = generer_dashbord.aggregate_ko_data(df)
+    parallelt = generer_dashbord.aggregate_ko_data(df, workers=2)
+
+    assert list(parallelt.items()) == list(serielt.items())
+
+
+def test_validate_drops_empty_rows_and_counts_invalid_rows_once():
+    df = pd.DataFrame({
+        "id": [1, 1, 2, 3, 4, 5],
+        "x": ["1", "2", None, "abc", "3", "x"],
+        "y": [1.0, None, None, "2", None, "y"],
+    })
+    df = generer_dashbord._validate(df, "test", ["x", "y"], ["id"])
+    kvalitet = df.attrs["kvalitet"]
+
+    assert df["id"].tolist() == [1, 1, 3, 4]
+    assert df["x"].tolist()[:2] == [1.0, 2.0] and pd.isna(df["x"][2])
+    assert kvalitet["rader"] == 6
+    assert kvalitet["uten_maaleverdier"] == 1
+    assert kvalitet["ugyldige_rader"] == 2
+    assert kvalitet["duplikate_nokler"] == 1
+
+
+def test_validate_flags_outliers_with_robust_z():
+    df = pd.DataFrame({
+        "gruppe": ["A"] * 6 + ["B"] * 4,
+        "verdi": [1.0, 1.1, 0.9, 1.0, 1.2, 10.0, 5.0, 5.0, 5.0, 9.0],
+    })
+    df = generer_dashbord._validate(df, "test", ["verdi"], ["gruppe"], avvik_maal=["verdi"], avvik_grupper=["gruppe"])
+
+    # B har MAD 0, så ingen z-score og ingen flagging
+    assert df["avvik"].tolist() == [False] * 5 + [True] + [False] * 4
+    assert df.attrs["kvalitet"]["avvik"] == 1
+
+
+@pytest.mark.parametrize("andel_ugyldige, stopper", [(0.2, False), (0.6, True)])
+def test_check_quality_counts_rows(andel_ugyldige, stopper):
+    antall_ugyldige = int(100 * andel_ugyldige)
+    df = pd.DataFrame({
+        "id": range(100),
+        "a": ["x"] * antall_ugyldige + ["1,5"] * (100 - antall_ugyldige),
+        "b": ["x"] * antall_ugyldige + ["2"] * (100 - antall_ugyldige),
+    })
+    kvalitet = generer_dashbord._validate(df, "test", ["a", "b"], ["id"]).attrs["kvalitet"]
+
+    assert kvalitet["ugyldige_rader"] + kvalitet["uten_maaleverdier"] == antall_ugyldige
+    if stopper:
+        with pytest.raises(ValueError):
+            generer_dashbord.check_quality(kvalitet)
+    else:
+        generer_dashbord.check_quality(kvalitet)
+
+
+def _js_funksjoner(*navn):
+    """Hent funksjonene med gitte navn fra sidemalen"""
+    with open(MAL, encoding="utf-8") as f:
+        innhold = f.read()
+    return "\n".join(
+        re.search(rf"^        (?:async )?function {n}\(.*?^        }}$", innhold, re.MULTILINE | re.DOTALL).group(0)
+        for n in navn
+    )
+
+
+# Minimal DOM for updateNokkelChart og exportCSV: utvalget leses fra `utvalg`, og
+# teksten som lastes ned fanges fra Blob
+_JS_RAMME = """
+let nokkelData, csvExportData = [], csvExportVisning = 'reiser', utvalg, lastetNed;
+const velg = verdier => ({ selectedOptions: verdier.map(value => ({ value })) });
+const document = {
+    getElementById: id => id === 'omrade-fra' ? velg(utvalg.fra) : id === 'omrade-til' ? velg(utvalg.til) : { style: {} },
+    querySelector: sel => ({ value: sel.includes('tid-nokkel') ? utvalg.tid : sel.includes('ukedag-nokkel') ? utvalg.ukedag : utvalg.visning }),
+    createElement: () => ({ click() {} }),
+};
+const Plotly = { newPlot() {} };
+class Blob { constructor(biter) { lastetNed = biter.join(''); } }
+const URL = { createObjectURL: () => 'blob:csv', revokeObjectURL() {} };
+"""
+
+
+def _js_export_csv(nokkel_data, utvalg):
+    """Kjør updateNokkelChart og exportCSV fra sidemalen i node for hvert utvalg"""
+    script = "\n".join([
+        _JS_RAMME,
+        _js_funksjoner("beregnGlidendeGjennomsnitt", "updateNokkelChart", "csvVerdi", "exportCSV"),
+        "const inn = JSON.parse(require('fs').readFileSync(0, 'utf8'));",
+        "nokkelData = inn.nokkelData;",
+        "(async () => {",
+        "    const resultat = [];",
+        "    for (utvalg of inn.utvalg) { updateNokkelChart(); await exportCSV(); resultat.push(lastetNed); }",
+        "    process.stdout.write(JSON.stringify(resultat));",
+        "})();",
+    ])
+    inn = json.dumps({"nokkelData": nokkel_data, "utvalg": utvalg}, allow_nan=False)
+    result = subprocess.run(["node", "-e", script], input=inn, capture_output=True, text=True, encoding="utf-8", check=True)
+    return json.loads(result.stdout)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="krever node")
+def test_nokkel_csv_matches_js_export():
+    df = generer_dashbord.load_and_process_nokkel_data(os.path.join(DATA, "inndata_asker_nokkel.csv"))
+    nokkel_data = generer_dashbord.prepare_nokkel_data(df)
+    fra, tid = nokkel_data["omrader_fra"], nokkel_data["tider"]
+
+    utvalg = [
+        {"fra": [], "til": [], "tid": "Alle", "ukedag": "Alle", "visning": "reiser"},
+        {"fra": fra[:2], "til": [], "tid": "Alle", "ukedag": "Weekday", "visning": "co2_sum"},
+        {"fra": fra[:1], "til": [], "tid": tid[0], "ukedag": "Alle", "visning": "co2_per_reise"},
+        {"fra": fra[:1], "til": [], "tid": "Alle", "ukedag": "Ingen", "visning": "reiser"},
+    ]
+    forventet = [
+        generer_dashbord.nokkel_csv(generer_dashbord.nokkel_series(nokkel_data, **u), u["visning"]) for u in utvalg
+    ]
+
+    assert forventet[3] == "\ufeffserie;kvartal;reiser;trend\n"
+    assert _js_export_csv(nokkel_data, utvalg) == forventet
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="krever node")
+def test_csv_verdi_matches_js():
+    verdier = ["Sentrum", "a;b", 'si "hei"', "linje\nskift", "vogn\rretur", "", None, 1.5, 2.0, -0.25, 1234.56]
+    script = "\n".join([
+        _js_funksjoner("csvVerdi"),
+        "const inn = JSON.parse(require('fs').readFileSync(0, 'utf8'));",
+        "process.stdout.write(JSON.stringify(inn.map(csvVerdi)));",
+    ])
+    result = subprocess.run(["node", "-e", script], input=json.dumps(verdier), capture_output=True, text=True, check=True)
+
+    assert json.loads(result.stdout) == [generer_dashbord._csv_verdi(v) for v in verdier]
+    assert generer_dashbord._csv_verdi("vogn\rretur") == '"vogn\rretur"'
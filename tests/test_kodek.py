@@ -0,0 +1,107 @@
+"""
+Rundturstester for kodek.py: encode_* -> decode_* (Python-speilet) og encode_* -> JS_DEKODER (node).
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+import kodek
+
+MAL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dashbord_mal.html")
+
+
+def _norsk(iso):
+    return f"{iso[8:10]}.{iso[5:7]}.{iso[0:4]}"
+
+
+def _dag_serie(datoer_iso, ko, forsinkelser):
+    return {"datoer": [_norsk(d) for d in datoer_iso], "datoer_iso": datoer_iso, "ko": ko, "forsinkelser": forsinkelser}
+
+
+KO_AGGREGATED = {
+    # hull i datoene, null og negative verdier
+    "Sentrum_Morgen": _dag_serie(
+        ["2024-01-02", "2024-01-03", "2024-01-10", "2024-03-01"],
+        [0.123, None, 1.5, 0.0],
+        [-0.25, 2.001, None, -1.999],
+    ),
+    # serie som starter etter basisdato
+    "Sentrum_Ettermiddag": _dag_serie(["2024-02-29", "2025-01-01"], [12.345, 0.001], [-0.001, 3.0]),
+    # flere records på samme dato gir nulldelta
+    "Sentrum_Morgen_records": {"records": [
+        {"dato_iso": "2024-01-02", "klokkeslett": "07:15", "ko": 0.5, "forsinkelser": -0.75},
+        {"dato_iso": "2024-01-02", "klokkeslett": "07:30", "ko": None, "forsinkelser": 0.0},
+        {"dato_iso": "2024-01-05", "klokkeslett": "07:15", "ko": 1.234, "forsinkelser": None},
+    ]},
+    "Sentrum_Morgen_klokkeslett": {"klokkeslett": ["07:30", "07:15", "08:00"], "ko": [0.2, None, -0.3],
+                                   "forsinkelser": [None, 1.111, 0.0]},
+}
+
+REISER_DATA = {
+    "Til Tromsø sentrum": {
+        "kvartaler": ["2023K1", "2023K2", "2023K3"],
+        "verdier": {"bil": [51.25, None, 49.0], "buss": [10.5, 11.75, -0.01], "sykkel": [0.0, 0.0, 0.0], "gange": [None, None, 3.33]},
+        "trend": {"bil": [51.25, 50.13, 50.13], "buss": [10.5, 11.13, 7.41], "sykkel": [0.0, 0.0, 0.0], "gange": [None, None, 3.33]},
+    },
+    "Tom": {"kvartaler": [], "verdier": {m: [] for m in kodek.REISER_MODI}, "trend": {m: [] for m in kodek.REISER_MODI}},
+}
+
+
+def test_fixed_round_trip_at_configured_precision():
+    for decimals in (kodek.KO_DESIMALER, kodek.REISER_DESIMALER):
+        skala = 10 ** decimals
+        values = [round(i / skala, decimals) for i in range(-3 * skala, 3 * skala + 1, 7)] + [None]
+        assert kodek.decode_fixed(kodek.encode_fixed(values, decimals), decimals) == values
+
+
+def test_days_round_trip_with_gaps_and_zero_deltas():
+    datoer = ["2024-02-28", "2024-02-28", "2024-02-29", "2024-03-01", "2024-12-31", "2025-01-01"]
+    dager = kodek.encode_days(datoer, "2024-02-01")
+    assert dager == [27, 0, 1, 1, 305, 1]
+    assert kodek.decode_days(dager, "2024-02-01") == datoer
+
+
+def test_ko_data_round_trip():
+    kodet = kodek.encode_ko_data(KO_AGGREGATED)
+    assert kodet["basisdato"] == "2024-01-02"
+    assert kodet["klokkeslett"] == ["07:15", "07:30", "08:00"]
+    assert kodek.decode_ko_data(kodet) == KO_AGGREGATED
+
+
+def test_ko_data_without_dates():
+    for ko_aggregated in ({}, {"Sentrum_Morgen_klokkeslett": KO_AGGREGATED["Sentrum_Morgen_klokkeslett"]}):
+        kodet = kodek.encode_ko_data(ko_aggregated)
+        assert kodet["basisdato"] is None
+        assert kodek.decode_ko_data(kodet) == ko_aggregated
+
+
+def test_reiser_data_round_trip():
+    assert kodek.decode_reiser_data(kodek.encode_reiser_data(REISER_DATA)) == REISER_DATA
+
+
+def _js_decode(kodet_ko, kodet_reiser):
+    """Kjør JS_DEKODER (med formatDateNorwegian fra sidemalen) i node på de kodede dataene"""
+    with open(MAL, encoding="utf-8") as f:
+        format_dato = re.search(r"^\s*function formatDateNorwegian\(.*$", f.read(), re.MULTILINE).group(0)
+    script = "\n".join([
+        format_dato,
+        kodek.JS_DEKODER,
+        "const inn = JSON.parse(require('fs').readFileSync(0, 'utf8'));",
+        "process.stdout.write(JSON.stringify({ ko: dekodKoData(inn.ko), reiser: dekodReiserData(inn.reiser) }));",
+    ])
+    result = subprocess.run(["node", "-e", script], input=json.dumps({"ko": kodet_ko, "reiser": kodet_reiser}),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="krever node")
+@pytest.mark.parametrize("ko_aggregated", [KO_AGGREGATED, {}], ids=["data", "tom"])
+def test_js_decoder_matches_input(ko_aggregated):
+    dekodet = _js_decode(kodek.encode_ko_data(ko_aggregated), kodek.encode_reiser_data(REISER_DATA))
+    assert dekodet["ko"] == ko_aggregated
+    assert dekodet["reiser"] == REISER_DATA
@@ -0,0 +1,85 @@
+"""
+Ende-til-ende-tester for pipeline.py uten ClickHouse, med LocalClient på en kopi av Data/.
+"""
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import datalager
+import oppdater_data
+import pipeline
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data")
+
+
+@pytest.fixture
+def kataloger(tmp_path):
+    kilde = tmp_path / "kilde"
+    kilde.mkdir()
+    for tabell in oppdater_data.SPORRINGER:
+        shutil.copy(oppdater_data.csv_path(DATA, tabell), kilde)
+    return str(kilde), str(tmp_path / "data"), str(tmp_path / "docs" / "index.html")
+
+
+def _innhold(katalog):
+    filer = {}
+    for rot, _, navn in os.walk(katalog):
+        for n in navn:
+            with open(os.path.join(rot, n), "rb") as f:
+                filer[os.path.relpath(os.path.join(rot, n), katalog)] = f.read()
+    return filer
+
+
+def test_builds_then_skips_unchanged_data(kataloger):
+    kilde, datakatalog, output = kataloger
+    client = oppdater_data.LocalClient(kilde)
+
+    kode, tider = pipeline.run_pipeline(client, datakatalog, output)
+    assert kode == pipeline.EXIT_OK
+    assert "bygg" in tider
+    assert os.path.exists(output)
+
+    kode, tider = pipeline.run_pipeline(client, datakatalog, output)
+    assert kode == pipeline.EXIT_OK
+    assert "bygg" not in tider
+
+
+def test_rebuilds_when_generator_changes(kataloger, monkeypatch):
+    kilde, datakatalog, output = kataloger
+    client = oppdater_data.LocalClient(kilde)
+    pipeline.run_pipeline(client, datakatalog, output)
+
+    monkeypatch.setattr(pipeline, "generator_version", lambda: "endret")
+    kode, tider = pipeline.run_pipeline(client, datakatalog, output)
+    assert kode == pipeline.EXIT_OK
+    assert "bygg" in tider
+
+
+def test_held_lock_gives_tempfail(kataloger):
+    kilde, datakatalog, output = kataloger
+    with pipeline.pipeline_lock(datakatalog):
+        kode = pipeline.main(["--lokal", kilde, "--datakatalog", datakatalog, "--output", output])
+    assert kode == pipeline.EXIT_LAAST
+    assert not os.path.exists(output)
+
+
+def test_corrupt_export_fails_build_and_leaves_docs(kataloger):
+    kilde, datakatalog, output = kataloger
+    client = oppdater_data.LocalClient(kilde)
+    pipeline.run_pipeline(client, datakatalog, output)
+    docs = os.path.dirname(output)
+    for_feil = _innhold(docs)
+
+    path = oppdater_data.csv_path(kilde, "ko")
+    df = pd.read_csv(path, sep=";", decimal=",", encoding="utf-8-sig", dtype=str)
+    for col in datalager.KO_MAALEVERDIER:
+        df[col] = "ugyldig"
+    df.to_csv(path, sep=";", index=False, encoding="utf-8-sig")
+
+    kode, tider = pipeline.run_pipeline(client, datakatalog, output)
+    assert kode == pipeline.EXIT_BYGG_FEILET
+    assert "bygg" not in tider
+    assert _innhold(docs) == for_feil